@@ -0,0 +1,123 @@
+"""
+Compare pweave's chunk tokenizer with the line-by-line parsing loop which it
+replaced, on synthetic documents of increasing size.
+
+Both parsers must split every document into exactly the same text and code
+chunks; the script stops with an error if they don't.
+
+Usage::
+
+    python benchmarks/parser_benchmark.py [-r repetitions]
+
+"""
+import imp
+import os
+import re
+import sys
+import time
+from optparse import OptionParser
+
+PWEAVE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'pweave', 'pweave')
+pweave = imp.load_source('pweave_script', PWEAVE_SCRIPT)
+
+
+def legacy_parse(input_text):
+    """The parsing part of pweave's original preprocess() loop.
+
+    Returns (kind, text, optionstring) tuples, where the original loop wrote
+    text to the output file or handed a code-block to a processor.
+
+    """
+    chunks = []
+    lines = input_text.splitlines(True)
+    state = 'text'
+    block = ''
+    text = []  # the original wrote text lines straight to a StringIO
+    for line in lines:
+        code = re.search('^<<(.*)>>=.*$', line.strip())
+        if code is not None:
+            state = 'code'
+            optionstring = code.group(1)
+            line = ''
+        if line.startswith('@'):
+            if text:
+                chunks.append(('text', ''.join(text), None))
+                text = []
+            chunks.append(('code', block, optionstring))
+            block = ''
+            state = 'text'
+            line = ''
+        if state == 'code':
+            if text:
+                chunks.append(('text', ''.join(text), None))
+                text = []
+            block = block + line
+        if state == 'text' and line:
+            text.append(line)
+    if text:
+        chunks.append(('text', ''.join(text), None))
+    return chunks
+
+
+def tokenizer_parse(input_text):
+    return [(c.kind, c.text, c.optionstring)
+            for c in pweave.parse_chunks(input_text)]
+
+
+def make_document(n_chunks, code_lines, text_lines):
+    "Return a synthetic source document."
+    parts = []
+    for i in range(n_chunks):
+        for j in range(text_lines):
+            parts.append('Paragraph %d, line %d of the documentation.\n' % (i, j))
+        parts.append('<<chunk%d, echo=True, fig=False>>=\n' % i)
+        for j in range(code_lines):
+            parts.append('x_%d_%d = %d * %d  # some code\n' % (i, j, i, j))
+        parts.append('@\n')
+    return ''.join(parts)
+
+
+def best_time(func, arg, repetitions):
+    best = None
+    for i in range(repetitions):
+        start = time.time()
+        func(arg)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("-r", "--repeat", dest="repetitions", type="int",
+          default=3,
+          help="Number of runs of each parser on each document (the best "
+               "one counts). Default is 3.")
+    opts, args = parser.parse_args()
+    if args:
+        parser.error("unexpected argument '%s'" % args[0])
+    repetitions = opts.repetitions
+
+    # (chunks, code lines per chunk, text lines per chunk)
+    shapes = [(10, 10, 10), (100, 10, 10), (1000, 10, 10), (2500, 10, 10),
+              (10, 1000, 10), (10, 5000, 10)]
+
+    print '%8s %10s %12s %14s %8s' % ('chunks', 'lines', 'legacy (s)',
+                                      'tokenizer (s)', 'speedup')
+    for n_chunks, code_lines, text_lines in shapes:
+        doc = make_document(n_chunks, code_lines, text_lines)
+        if legacy_parse(doc) != tokenizer_parse(doc):
+            sys.exit("parsers disagree on document with shape %r" %
+                     ((n_chunks, code_lines, text_lines),))
+
+        t_legacy = best_time(legacy_parse, doc, repetitions)
+        t_tokenizer = best_time(tokenizer_parse, doc, repetitions)
+        print '%8d %10d %12.4f %14.4f %7.1fx' % (n_chunks, doc.count('\n'),
+                                                 t_legacy, t_tokenizer,
+                                                 t_legacy / t_tokenizer)
+
+
+if __name__ == '__main__':
+    main()
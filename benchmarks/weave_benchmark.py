@@ -0,0 +1,405 @@
+"""
+Benchmarks for the stages of pweave's weave pipeline.
+
+Option parsing, chunk parsing, code execution, the table and autowrap
+processors, figure export and whole-document weaving (of synthetic tex, rst
+and sphinx documents) are timed separately.  Each benchmark reports the best
+of several runs.  The results can be saved as JSON, and compared with a
+previously saved baseline; the script exits with status 1 if a benchmark got
+slower than the baseline by more than the threshold.
+
+Usage::
+
+    python benchmarks/weave_benchmark.py [-o results.json] [-b baseline.json]
+
+"""
+import imp
+import json
+import os
+import platform
+import re
+import shutil
+import StringIO
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from optparse import OptionParser
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PWEAVE_SCRIPT = os.path.join(BENCHMARK_DIR, os.pardir, 'pweave', 'pweave')
+PLUGIN_DIR = os.path.join(BENCHMARK_DIR, os.pardir, 'pweave',
+                          'pweave_plugins')
+pweave = imp.load_source('pweave_script', PWEAVE_SCRIPT)
+
+try:
+    import matplotlib
+    have_matplotlib = True
+except ImportError:
+    have_matplotlib = False
+
+
+def clear_caches():
+    """Empty pweave's module-level caches.
+
+    Compiled code-blocks and parsed option strings are kept between calls, so
+    without this only the first run of a benchmark would do that work.
+
+    """
+    pweave.compiled_code.clear()
+    pweave.option_cache.clear()
+    pweave.reported_option_errors.clear()
+
+
+def setup_pweave(fmt, output_dir):
+    """Give pweave the settings it would have for a *fmt* document.
+
+    Returns the processors, with those of all plugins loaded.  pweave's caches
+    are cleared.
+
+    """
+    clear_caches()
+    settings = defaultdict(lambda: None)
+    settings.update({
+        'format': fmt,
+        'img_format': {'tex': '.pdf', 'rst': '.png', 'sphinx': '.png'}[fmt],
+        'sphinxteximg_format': '.pdf',
+        'sourcefile_path': os.path.join(output_dir, 'bench.w'),
+        'base_output_path': output_dir,
+        'imgfolder_path': os.path.join(output_dir, 'images'),
+        'basename': 'bench',
+        'plugindir': PLUGIN_DIR,
+        })
+    pweave.settings = settings
+    pweave.figure_exporter = pweave.FigureExporter(0)
+    pweave.execution_backend.reset()
+
+    processors = pweave.load_processor_plugins(settings)
+    # the plugins import pweave as __main__
+    main_module = sys.modules['__main__']
+    sys.modules['__main__'] = pweave
+    try:
+        for name in ['default', 'table', 'autowrap', 'mplfig']:
+            processors[name]
+    finally:
+        sys.modules['__main__'] = main_module
+    return processors
+
+
+def make_document(fmt, n_chunks, chunk_lines, n_figures=0, table_rows=0):
+    """Return a synthetic source document.
+
+    It has *n_chunks* code-blocks of *chunk_lines* lines, *n_figures* of
+    which draw a figure.  tex documents also get a table with *table_rows*
+    rows (if not 0) and an autowrap block.
+
+    """
+    parts = []
+    if fmt == 'tex':
+        parts.append('\\section{Benchmark}\n')
+    else:
+        parts.append('Benchmark\n=========\n\n')
+    parts.append('<<>>=\nimport math\n@\n')
+    if n_figures:
+        parts.append('<<>>=\nimport matplotlib.pyplot as plt\n@\n')
+
+    for i in range(n_chunks):
+        parts.append('Paragraph %d of the documentation, with some words '
+                     'in it.\n\n' % i)
+        if i < n_figures:
+            parts.append('<<fig=True, caption="Figure %d">>=\n' % i)
+            parts.append('plt.plot([math.sin(x / 10.0 + %d) '
+                         'for x in range(100)])\n' % i)
+        else:
+            parts.append('<<echo=True>>=\n')
+        for j in range(chunk_lines):
+            parts.append('x_%d = math.sqrt(%d) * %d\n' % (j, i + j, j))
+        parts.append('print x_0\n@\n\n')
+
+    if fmt == 'tex' and table_rows:
+        parts.append('<<p=table, caption="Table">>=\n')
+        parts.append('tablerows = [[i, i * 2, math.sqrt(i)] '
+                     'for i in range(%d)]\n@\n' % table_rows)
+    if fmt == 'tex':
+        parts.append('<<p=autowrap, textbf_wrapped=words#pweave>>=\n')
+        parts.append('Some words about pweave, and !!pweave.\n' * 20)
+        parts.append('@\n')
+    return ''.join(parts)
+
+
+def best_time(func, repetitions, setup=None):
+    "Return the shortest time taken by func() (after setup(), if given)."
+    best = None
+    for i in range(repetitions):
+        if setup is not None:
+            setup()
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def make_option_strings(n):
+    "Return *n* different option strings, of the kinds found in documents."
+    templates = [
+        'echo=%(flag)s',
+        'chunk%(i)d, echo=%(flag)s, fig=True, width="%(i)d cm", '
+            'caption="Figure %(i)d, with a comma"',
+        'p=table, caption="Results %(i)d", column_labels=cols%(i)d, '
+            'row_labels=rows',
+        'results="%(results)s", term=%(flag)s, evaluate=True',
+        'p=autowrap, textbf_wrapped=word%(i)d#pweave, emph_wrapped=x',
+        ]
+    return [templates[i % len(templates)] %
+            {'i': i, 'flag': ['True', 'False'][i % 2],
+             'results': ['verbatim', 'tex', 'rst'][i % 3]}
+            for i in range(n)]
+
+
+def bench_get_options(output_dir):
+    # every string is new to the cache
+    cold_strings = make_option_strings(6000)
+    # few enough strings to all stay in the cache
+    warm_strings = make_option_strings(pweave.option_cache_size // 2) * 12
+
+    def parse(option_strings):
+        for s in option_strings:
+            pweave.get_options(s)
+
+    def prime():
+        clear_caches()
+        parse(warm_strings)
+
+    yield ('get_options (cold cache, %d strings)' % len(cold_strings),
+           lambda: parse(cold_strings), clear_caches)
+    yield ('get_options (warm cache, %d strings)' % len(warm_strings),
+           lambda: parse(warm_strings), prime)
+
+
+def bench_parse(output_dir):
+    for n_chunks, chunk_lines in [(100, 10), (1000, 10), (10, 2000)]:
+        doc = make_document('tex', n_chunks, chunk_lines)
+        yield ('parse (%d chunks x %d lines)' % (n_chunks, chunk_lines),
+               lambda: pweave.parse_chunks(doc))
+
+
+def bench_exec_code(output_dir):
+    processor = setup_pweave('tex', output_dir)['default']
+
+    def statements():
+        for i in range(1000):
+            processor.exec_code('x = %d' % i)
+
+    def expressions():
+        for i in range(1000):
+            processor.exec_code('x + %d' % i)
+
+    transcript = ''.join('y_%d = %d\ny_%d * 2\n' % (i, i, i)
+                         for i in range(500))
+
+    yield 'exec_code (1000 statements)', statements, clear_caches
+    yield 'exec_code (1000 expressions)', expressions, clear_caches
+    yield ('exec_term (1000 lines)', lambda: processor.exec_term(transcript),
+           clear_caches)
+
+
+def bench_table(output_dir):
+    processor = setup_pweave('tex', output_dir)['table']
+    for n_rows in [10, 1000, 10000]:
+        processor.execution_namespace['tablerows'] = \
+                [[i, i * 2.5, 'row %d' % i, i % 7] for i in range(n_rows)]
+        options = processor.merged_options({'caption': 'Table'})
+        yield ('table (%d rows x 4 columns)' % n_rows,
+               lambda: processor.process_code('', options))
+
+
+def bench_autowrap(output_dir):
+    processor = setup_pweave('tex', output_dir)['autowrap']
+    fragments = ['word%d' % i for i in range(20)]
+    text = ' '.join(fragments + ['!!word3', 'other', 'text']) + '\n'
+    for n_lines in [100, 2000]:
+        codeblock = text * n_lines
+        options = processor.merged_options(
+                        {'textbf_wrapped': '#'.join(fragments[:10]),
+                         'emph_wrapped': '#'.join(fragments[10:])})
+        yield ('autowrap (%d lines, 20 fragments)' % n_lines,
+               lambda: processor.process_code(codeblock, options))
+
+
+def bench_figures(output_dir):
+    if not have_matplotlib:
+        return
+    setup_pweave('tex', output_dir)
+    pyplot = pweave.get_pyplot()
+    pyplot.figure()
+    for i in range(20):
+        pyplot.plot([x * i for x in range(1000)])
+    fig = pyplot.gcf()
+    image_dir = os.path.join(output_dir, 'figures')
+    os.mkdir(image_dir)
+
+    for ext in ['png', 'pdf', 'svg']:
+        filename = os.path.join(image_dir, 'figure.' + ext)
+
+        def remove():
+            if os.path.exists(filename):
+                os.remove(filename)
+
+        def save():
+            exporter = pweave.FigureExporter(0)
+            exporter.save(fig, filename)
+            exporter.join()
+
+        yield 'figure export (%s, written)' % ext, save, remove
+        yield 'figure export (%s, unchanged)' % ext, save
+
+    filenames = [os.path.join(image_dir, 'formats.' + ext)
+                 for ext in ['png', 'pdf']]
+
+    def save_formats():
+        exporter = pweave.FigureExporter(0)
+        exporter.save(fig, filenames, dpi=200)
+        exporter.join()
+    yield 'figure export (png+pdf, unchanged)', save_formats
+
+    # a plot with too many points for vector formats
+    dense = pyplot.figure()
+    pyplot.scatter([(x * 7919) % 1000 for x in range(100000)],
+                   [(x * 104729) % 1000 for x in range(100000)])
+    for threshold in [0, 10000]:
+        filename = os.path.join(image_dir, 'dense%d.pdf' % threshold)
+
+        def save_dense():
+            exporter = pweave.FigureExporter(0)
+            exporter.save(dense, filename, threshold)
+            exporter.join()
+        yield ('figure export (pdf, 100000 points, rasterize %d)' %
+               threshold, save_dense)
+    pyplot.close('all')
+
+
+def bench_weave(output_dir):
+    shapes = [(20, 5, 0, 10), (200, 5, 0, 100), (20, 5, 5, 0)]
+    for fmt in ['tex', 'rst', 'sphinx']:
+        for n_chunks, chunk_lines, n_figures, table_rows in shapes:
+            if n_figures and not have_matplotlib:
+                continue
+            if fmt != 'tex':
+                table_rows = 0  # tables are LaTeX only
+            doc = make_document(fmt, n_chunks, chunk_lines, n_figures,
+                                table_rows)
+            chunks = pweave.parse_chunks(doc)
+            state = {}
+
+            def setup():
+                state['processors'] = setup_pweave(fmt, output_dir)
+
+            def run():
+                pweave.weave(chunks, StringIO.StringIO(), StringIO.StringIO(),
+                             state['processors'])
+
+            yield ('weave %s (%d chunks, %d figures, %d table rows)' %
+                   (fmt, n_chunks, n_figures, table_rows), run, setup)
+
+
+def run_benchmarks(repetitions, pattern):
+    "Run the benchmarks with names matching *pattern*; return the results."
+    benchmarks = [bench_get_options, bench_parse, bench_exec_code,
+                  bench_table, bench_autowrap, bench_figures, bench_weave]
+    results = {}
+    output_dir = tempfile.mkdtemp(prefix='pweave_benchmark_')
+    stdout = sys.stdout
+    try:
+        for benchmark in benchmarks:
+            # each benchmark yields (name, func) or (name, func, setup)
+            for found in benchmark(output_dir):
+                name = found[0]
+                if pattern is not None and not re.search(pattern, name):
+                    continue
+                # discard what the benchmarked code prints
+                sys.stdout = StringIO.StringIO()
+                try:
+                    results[name] = best_time(found[1], repetitions,
+                                              *found[2:])
+                finally:
+                    sys.stdout = stdout
+                print '%-55s %10.4f s' % (name, results[name])
+            shutil.rmtree(output_dir)
+            os.mkdir(output_dir)
+    finally:
+        shutil.rmtree(output_dir)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the results next to the baseline ones.
+
+    Returns the number of benchmarks which are more than *threshold* (a
+    fraction) slower than in the baseline.
+
+    """
+    print
+    print '%-55s %10s %10s %8s' % ('benchmark', 'baseline', 'current',
+                                    'ratio')
+    slower = 0
+    for name in sorted(results.keys()):
+        if name not in baseline:
+            print '%-55s %10s %10.4f' % (name, '-', results[name])
+            continue
+        ratio = results[name] / max(baseline[name], 1e-9)
+        note = ''
+        if ratio > 1 + threshold:
+            note = '  SLOWER'
+            slower += 1
+        elif ratio < 1 - threshold:
+            note = '  faster'
+        print '%-55s %10.4f %10.4f %7.2fx%s' % (name, baseline[name],
+                                                results[name], ratio, note)
+    return slower
+
+
+def main():
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("-o", "--output", dest="output", default=None,
+          help="Write the results to this JSON file.")
+    parser.add_option("-b", "--baseline", dest="baseline", default=None,
+          help="Compare the results with those in this JSON file (written "
+               "by an earlier run with -o).")
+    parser.add_option("-t", "--threshold", dest="threshold", type="float",
+          default=0.1,
+          help="Fraction by which a benchmark may be slower than the "
+               "baseline before it counts as a regression. Default is 0.1.")
+    parser.add_option("-r", "--repeat", dest="repetitions", type="int",
+          default=5,
+          help="Number of runs of each benchmark (the best one counts). "
+               "Default is 5.")
+    parser.add_option("-k", dest="pattern", default=None,
+          help="Only run benchmarks whose names match this regular "
+               "expression.")
+    opts, args = parser.parse_args()
+
+    results = run_benchmarks(opts.repetitions, opts.pattern)
+
+    if opts.output:
+        f = open(opts.output, 'w')
+        json.dump({'python': platform.python_version(),
+                   'platform': platform.platform(),
+                   'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                   'repetitions': opts.repetitions,
+                   'results': results},
+                  f, indent=1, sort_keys=True, separators=(',', ': '))
+        f.write('\n')
+        f.close()
+
+    if opts.baseline:
+        f = open(opts.baseline, 'r')
+        baseline = json.load(f)['results']
+        f.close()
+        if compare(results, baseline, opts.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
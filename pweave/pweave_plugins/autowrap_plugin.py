@@ -8,9 +8,7 @@ This module defines the AutoWrapProcessor class for use with pweave.
 import __main__ as pweave
 CodeProcessor = pweave.CodeProcessor
 
-from string import Template
 import re
-import sys
 
 #TODO: make more general (e.g. not specific to LaTeX) -- just a "put x before
 #      and y after" plugin.
@@ -24,9 +22,11 @@ class AutoWrapProcessor(CodeProcessor):
     version of the fragment, where the command surrounds the fragment (e.g.
     "\mathbf{<string>}" could replace <string>). 
     
-    Beware of defining conflicting (overlapping) text-fragments, since if a
-    part of the code-block matches more than one text-fragment, the behavior
-    may not be as you expect it. 
+    The code-block is scanned once from left to right.  Where more than one
+    text-fragment matches at the same position, the longest one is wrapped;
+    the scan then continues after it, so that the wrapped text is never
+    searched again.  If the same text-fragment is listed for more than one
+    command, the command whose name sorts last is used.
     
     The following code-block options are accepted:
     
@@ -43,10 +43,7 @@ class AutoWrapProcessor(CodeProcessor):
                           the codeblock is preceeded by these two characters,
                           the text will *NOT* be substituted, and the two
                           characters will be removed from the passed-through
-                          text.  The default value is '!!'.  Note, that the
-                          two-character requirement is due to a limitation
-                          imposed by using a negative lookbehind in a regular
-                          expression pattern.
+                          text.  The default value is '!!'.
     
     """
     def name(self):
@@ -64,61 +61,82 @@ class AutoWrapProcessor(CodeProcessor):
     def process_code(self, codeblock, codeblock_options):
         # build a dictionary of 'frag':'command' mappings
         fragment_dict = {}
-        for k,v in codeblock_options.iteritems():
+        for k in sorted(codeblock_options.keys()):
             if k.endswith("_wrapped"):
                 cmd = k[0:-8] # chop off '_wrapped'
+                v = codeblock_options[k]
                 for frag in v.split(codeblock_options['list_delimiter']):
-                    fragment_dict[frag] = cmd
+                    if frag:
+                        fragment_dict[frag] = cmd
         
-        substitution_vars = {}
-        # build substitution dictionary (allows for more general substitutions
-        # in the future), at the same time replacing fragments with a 
-        # substitution-variable.
+        if not fragment_dict:
+            return (codeblock, '')
         
-        esc = codeblock_options['escape_delimiter']
-
-        i=0
-        placeholder_root = "autowrap_"
-        placeholder_tmp_root = esc + esc.join(list(placeholder_root)) + esc 
-        for frag,cmd in fragment_dict.iteritems():
-            repl_str = '\\' + cmd + '{' + frag + '}'
-            placeholder = placeholder_root + str(i)
-            
-            # temp-placeholder needed to prevent substituting parts of the
-            # placeholders during the substitution loop.
-            placeholder_tmp = placeholder_tmp_root + str(i)
-            
-            substitution_vars[placeholder] = repl_str
-            
-            escapedfrag = re.escape(frag)
-            # only replace when frag is not immediately preceded by '!!' or '${'.
-            # uses a "negative lookbehind" assertion: (?<!....)
-            pattern = r'(?<!\$\{|'+re.escape(esc)+')' + escapedfrag
-            codeblock = re.sub(pattern, r'${' + placeholder_tmp + r'}', codeblock)
-            
-            i += 1
-            
-        # now all autowrap comamnd substitutions are finished -- replace
-        # escaped placeholders with 'legal' placeholders so Template()
-        # likes the placeholder names.
-        codeblock = codeblock.replace(placeholder_tmp_root, placeholder_root)
-            
-        # loop once more, this time removing '!!' preceeding fragments
-        for frag,cmd in fragment_dict.iteritems():
-            pattern = re.escape(esc) + re.escape(frag)
-            codeblock = re.sub(pattern, re.escape(frag), codeblock) 
+        matcher = get_matcher(fragment_dict,
+                              codeblock_options['escape_delimiter'])
         
-        # add any additional items to substitution_vars dict here...
-        
-        # perform substitutions
-        try:
-            document_text = \
-                Template(codeblock).substitute(substitution_vars)
-        except ValueError, e:
-            print e, ':'
-            print codeblock
-            sys.exit(1)
+        def wrap(match):
+            frag = match.group(2)
+            if match.group(1):
+                # escaped: pass the fragment through without the escape
+                return frag
+            return '\\' + fragment_dict[frag] + '{' + frag + '}'
         
+        document_text = matcher.sub(wrap, codeblock)
         code_text = ''
         
         return (document_text, code_text)
+
+    def tangle_code(self, codeblock, codeblock_options):
+        return ''
+
+
+# compiled matchers, by fragment list and escape delimiter
+matchers = {}
+
+def get_matcher(fragment_dict, escape_delimiter):
+    """Return a compiled pattern matching any of the keys of *fragment_dict*.
+
+    Group 1 of a match is the escape delimiter (if the fragment is escaped),
+    and group 2 is the longest fragment which matched.
+
+    """
+    key = (tuple(sorted(fragment_dict.iterkeys())), escape_delimiter)
+    matcher = matchers.get(key)
+    if matcher is None:
+        if len(matchers) > 100:
+            matchers.clear()
+        matcher = re.compile('(%s)?(%s)' % (re.escape(escape_delimiter),
+                                            trie_pattern(key[0])))
+        matchers[key] = matcher
+    return matcher
+
+def trie_pattern(fragments):
+    """Return a regular expression matching the longest of *fragments*.
+
+    The fragments are arranged in a trie, so that the expression has common
+    prefixes factored out, and a fragment which is a prefix of another one is
+    an optional ending which is only used when the longer one doesn't match.
+
+    """
+    trie = {}
+    for frag in fragments:
+        node = trie
+        for char in frag:
+            node = node.setdefault(char, {})
+        node[''] = None  # end of a fragment
+    return node_pattern(trie)
+
+def node_pattern(node):
+    "Return the regular expression for the fragment endings below *node*."
+    alternatives = [re.escape(char) + node_pattern(child)
+                    for char, child in sorted(node.iteritems()) if char]
+    if not alternatives:
+        return ''
+    if len(alternatives) == 1 and len(alternatives[0]) == 1:
+        pattern = alternatives[0]
+    else:
+        pattern = '(?:' + '|'.join(alternatives) + ')'
+    if '' in node:
+        pattern += '?'
+    return pattern
@@ -10,7 +10,6 @@ CodeProcessor = pweave.CodeProcessor
 
 from string import Template
 import os
-import matplotlib.pyplot as plt
 
 class MatplotlibFigureProcessor(CodeProcessor):
     """Processor for generating (LaTeX) figures from matplotlib plots.
@@ -149,14 +148,16 @@ $verbatim
 
     def write_figure(self, filename):
         "Write (and clear) the matplotlib fig as a pdf to the specified file."
-        plt.savefig(filename, dpi = 200)
-        plt.clf()
+        self.save_figure(filename, dpi=self.settings['dpi'] or 200)
+        self.clear_figure()
 
 
     def process_code(self, codeblock, codeblock_options):
         substitution_vars = self.get_substitution_dict(codeblock_options)
 
         # execute the codeblock, storing results in self.execution_namespace
+        # (importing pyplot first, so that the Agg backend is used)
+        pweave.get_pyplot()
         self.exec_code(codeblock)
 
         capt = codeblock_options['caption']
@@ -170,12 +171,19 @@ $verbatim
         document_text = \
             Template(self.output_template_str()).substitute(substitution_vars)
 
-        # by default, don't echo the codeblock to the output document
-        if codeblock_options['echo'].lower() == 'true':
-            code_text = codeblock
-
-        else:
-            code_text = ''
+        code_text = self.tangle_code(codeblock, codeblock_options)
 
         self.figure_number += 1
         return (document_text, code_text)
+
+    def skip_code(self, codeblock, codeblock_options):
+        self.figure_number += 1
+
+    def tangle_code(self, codeblock, codeblock_options):
+        # by default, don't echo the codeblock to the output document
+        if codeblock_options['echo'].lower() == 'true':
+            return codeblock
+        return ''
+
+    def saves_figure(self, codeblock_options):
+        return True
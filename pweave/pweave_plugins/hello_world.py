@@ -62,6 +62,12 @@ class HelloWorldProcessor(CodeProcessor):
     
     def process_code(self, codeblock, codeblock_options):
         document_text = codeblock_options['hello_text']
-        code_text = "print '%s'" % codeblock_options['hello_text']
+        code_text = self.tangle_code(codeblock, codeblock_options)
         
         return (document_text, code_text)
+    
+    def tangle_code(self, codeblock, codeblock_options):
+        # called instead of process_code() by "pweave --tangle-only"; only
+        # needs to be defined if code_text can be found without executing
+        # anything
+        return "print '%s'" % codeblock_options['hello_text']
@@ -10,7 +10,6 @@ CodeProcessor = pweave.CodeProcessor
 
 import os
 import StringIO
-import matplotlib.pyplot as plt
 
 #TODO: make more general (e.g. not specific to LaTeX) -- just a "put x before
 #      and y after" plugin.
@@ -116,9 +115,10 @@ class LegacyDefaultProcessor(CodeProcessor):
             outbuf.write('\n')
             if self.settings['format']=="tex": outbuf.write(codestart)
             
-            for x in codeblock.splitlines():
-                outbuf.write('>>> ' + x + '\n')
-                result = self.exec_code(x)
+            for lines, result in self.exec_term(codeblock):
+                outbuf.write('>>> ' + lines[0] + '\n')
+                for x in lines[1:]:
+                    outbuf.write('... ' + x + '\n')
                 if len(result) > 0:
                     outbuf.write(result)
             
@@ -135,10 +135,11 @@ class LegacyDefaultProcessor(CodeProcessor):
             #evaluate code and include results in output file?
             if blockoptions['evaluate'].lower() == 'true':
                 if blockoptions['fig'].lower() == 'true':
+                    # make sure the Agg backend is in place before the code
+                    # runs (this is where matplotlib usually gets imported)
+                    pweave.get_pyplot()
                     #A placeholder for figure options
-                    #import matplotlib
                     #matplotlib.rcParams['figure.figsize'] = (6, 4.5)
-                    pass
                 
                 result = self.exec_code(codeblock).splitlines()
         
@@ -162,7 +163,7 @@ class LegacyDefaultProcessor(CodeProcessor):
         if blockoptions['fig'].lower() == 'true':
             figname = os.path.join(self.settings['imgfolder_path'],'Fig' +str(self.nfig) \
                     + self.settings['img_format'])
-            plt.savefig(figname, dpi = 200)
+            self.save_figure(figname, dpi = 200)
             
             #TODO: why can't we just set 'img_format' for sphinx like we do for
             #      tex and rst?
@@ -171,8 +172,8 @@ class LegacyDefaultProcessor(CodeProcessor):
                 figname2 = figname2_base + self.settings['sphinxteximg_format']
                 figname2_base_rel = \
                     os.path.relpath(figname2_base, self.settings['base_output_path'])
-                plt.savefig(figname2)
-            plt.clf()
+                self.save_figure(figname2)
+            self.clear_figure()
             if self.settings['format'] == 'rst':
                 if blockoptions['caption']:
                     #If the image has a caption, use Figure directive
@@ -205,3 +206,10 @@ class LegacyDefaultProcessor(CodeProcessor):
         outbuf.close()
         
         return (document_text, codeblock) # document_text, code_text
+
+    def skip_code(self, codeblock, codeblock_options):
+        if codeblock_options['fig'].lower() == 'true':
+            self.nfig += 1
+
+    def tangle_code(self, codeblock, codeblock_options):
+        return codeblock
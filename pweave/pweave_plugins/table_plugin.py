@@ -8,21 +8,23 @@ This module defines a TableProcessor class for use with pweave.
 import __main__ as pweave
 CodeProcessor = pweave.CodeProcessor
 
+from itertools import izip
 from string import Template
 
 class TableProcessor(CodeProcessor):
     """Processor for generating (LaTeX) tables.
     
-    This processor generates a table from a nested-list.
+    This processor generates a table from a nested-list, a NumPy array or a
+    pandas DataFrame.
     
     The following code-block options are accepted:
     
-    *table_list_name* -- (optional) specifies the name of a nested list which
-                         the code-block will create that contains the contents
-                         of the table.  Each sublist in the list represents one
-                         row of the table, and can contain either string or
-                         numeric values.  By default, this option is set to
-                         "table_rows". 
+    *table_list_name* -- (optional) specifies the name of the table which
+                         the code-block will create.  This is either a nested
+                         list, in which each sublist represents one row of the
+                         table and can contain either string or numeric values,
+                         or a 2-d NumPy array or a pandas DataFrame.  By
+                         default, this option is set to "tablerows".
     
     *column_labels* -- (optional) specifies the name of a list which contains
                        the column labels. 
@@ -30,6 +32,17 @@ class TableProcessor(CodeProcessor):
     *row_labels* -- (optional) specifies the name of a list which contains the
                     row labels.
     
+    *column_formats* -- (optional) specifies the name of a list with a
+                        %-format (such as "%.3f") for each column, or of a
+                        single format for all the columns.  Columns without
+                        a format (None) are converted with str().
+    
+    *longtable_rows* -- (optional) tables with more rows than this are
+                        typeset with the longtable package (which must be
+                        loaded by the document), so that they can break
+                        across pages.  "false" never uses longtable.  By
+                        default, this option is set to 1000.
+    
     TODO: other formatting options
     
     """
@@ -44,6 +57,8 @@ class TableProcessor(CodeProcessor):
                             'table_list_name': 'tablerows',
                             'column_labels': None,
                             'row_labels': None,
+                            'column_formats': None,
+                            'longtable_rows': '1000',
                             'echo': 'false',
                           }
         
@@ -64,6 +79,21 @@ $rows
 \end{tabular}
 \end{center}
 \end{table}
+'''
+
+    def longtable_template_str(self):
+        return r'''
+\begin{longtable}{$tabular_format}
+\caption{$caption}\\
+\hline
+$columnlabels\endfirsthead
+\hline
+$columnlabels\endhead
+\hline
+\endfoot
+
+$rows
+\end{longtable}
 '''
     
     def col_label_str(self, col_labels):
@@ -77,25 +107,54 @@ $rows
         
         return s
     
-    def rows_str(self, table_rows, row_labels=None):
+    def rows_str(self, table_rows, row_labels=None, column_formats=None):
         "Return LaTeX code for all rows"
         
-        s = ''
-        for i,row in enumerate(table_rows):
-            latex_row_elems = [str(elem) for elem in row]
-            if row_labels is not None:
-                latex_row_elems.insert(0, r'\textbf{' + str(row_labels[i]) + r'}')
-            
-            s += r' & '.join(latex_row_elems) + r'\\' + "\n"
+        formats = self.expand_formats(column_formats, n_columns(table_rows))
+        if is_array(table_rows):
+            # format whole columns at once, rather than element by element
+            columns = [self.format_column(column, fmt) for column, fmt in
+                       izip(array_columns(table_rows), formats)]
+            rows = izip(*columns)
+        elif column_formats is None:
+            rows = ([str(elem) for elem in row] for row in table_rows)
+        else:
+            rows = ([str(elem) if fmt is None else fmt % elem
+                     for elem, fmt in izip(row, formats)]
+                    for row in table_rows)
+        
+        if row_labels is None:
+            lines = [r' & '.join(row) + r'\\' for row in rows]
+        else:
+            lines = [r'\textbf{' + str(label) + r'} & ' + r' & '.join(row) +
+                     r'\\' for label, row in izip(row_labels, rows)]
+        lines.append(r'\hline' + "\n")
         
-        s += r'\hline' + "\n"
+        return "\n".join(lines)
+    
+    def format_column(self, column, fmt):
+        "Return the LaTeX code of the cells in *column* (a sequence)."
+        if fmt is None:
+            return [str(elem) for elem in column]
+        if is_array(column):
+            # formatting python numbers is faster than numpy scalars
+            column = column.tolist()
+        return [fmt % elem for elem in column]
+    
+    def expand_formats(self, column_formats, n_columns):
+        "Return a list of *n_columns* formats (or None) from *column_formats*."
+        if column_formats is None or isinstance(column_formats, basestring):
+            return [column_formats] * n_columns
         
-        return s
+        if len(column_formats) != n_columns:
+            raise ValueError("table has %d columns, but %d column formats "
+                             "are given" % (n_columns, len(column_formats)))
+        return list(column_formats)
     
     def tabular_format_str(self, table_rows, row_labels=None):
         "Return LaTeX 'tabular' environment format string"
  
-        row_length = len(table_rows[0])
+        row_length = n_columns(table_rows)
         if row_labels is not None:
             row_length += 1
         
@@ -114,7 +173,8 @@ $rows
         # execute the codeblock, storing results in self.execution_namespace
         self.exec_code(codeblock)
         # extract object from exec_code()'s namespace:
-        table_rows = self.execution_namespace['tablerows']
+        table_rows = \
+            self.execution_namespace[codeblock_options['table_list_name']]
         
         if codeblock_options['column_labels'] is not None:
             col_labels = self.execution_namespace[codeblock_options['column_labels']]
@@ -127,17 +187,55 @@ $rows
         else:
             row_labels = None
         
-        substitution_vars['rows'] = self.rows_str(table_rows, row_labels)
+        if codeblock_options['column_formats'] is not None:
+            column_formats = \
+                self.execution_namespace[codeblock_options['column_formats']]
+        else:
+            column_formats = None
+        
+        substitution_vars['rows'] = self.rows_str(table_rows, row_labels,
+                                                  column_formats)
         substitution_vars['tabular_format'] = self.tabular_format_str(table_rows, row_labels)
         substitution_vars['caption'] = codeblock_options['caption']
 
-        document_text = \
-            Template(self.output_template_str()).substitute(substitution_vars)
-        
-        # by default, don't echo the codeblock to the output document
-        if codeblock_options['echo'].lower() == 'true':
-            code_text = codeblock
+        longtable_rows = codeblock_options['longtable_rows']
+        if longtable_rows.lower() != 'false' and \
+                len(table_rows) > int(longtable_rows):
+            template = self.longtable_template_str()
         else:
-            code_text = ''
+            template = self.output_template_str()
+        document_text = Template(template).substitute(substitution_vars)
+        
+        code_text = self.tangle_code(codeblock, codeblock_options)
         
         return (document_text, code_text)
+    
+    def tangle_code(self, codeblock, codeblock_options):
+        # by default, don't echo the codeblock to the output document
+        if codeblock_options['echo'].lower() == 'true':
+            return codeblock
+        return ''
+
+
+def is_array(table):
+    "Return True if *table* is a NumPy array or a pandas DataFrame."
+    return hasattr(table, 'shape') and hasattr(table, 'ndim')
+
+
+def n_columns(table):
+    "Return the number of columns of *table*."
+    if is_array(table):
+        if table.ndim == 1:
+            return 1
+        return table.shape[1]
+    return len(table[0])
+
+
+def array_columns(table):
+    "Return the columns of an array or DataFrame *table*, as 1-d arrays."
+    if table.ndim == 1:
+        return [table]
+    if hasattr(table, 'iloc'):
+        # pandas DataFrame
+        return [table.iloc[:, i].values for i in range(table.shape[1])]
+    return [table[:, i] for i in range(table.shape[1])]
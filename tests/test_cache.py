@@ -0,0 +1,177 @@
+"""
+Check that the chunk cache (see ChunkCache and CachedWeave) reuses the results
+of unchanged code-blocks, and executes blocks again whenever they, or any
+block before them, changed -- resuming from checkpoints where possible.
+
+Usage::
+
+    python -m unittest discover tests
+
+"""
+import glob
+import imp
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+from collections import defaultdict
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PWEAVE_SCRIPT = os.path.join(TEST_DIR, os.pardir, 'pweave', 'pweave')
+PLUGIN_DIR = os.path.join(TEST_DIR, os.pardir, 'pweave', 'pweave_plugins')
+pweave = imp.load_source('pweave_script', PWEAVE_SCRIPT)
+
+
+def make_document(blocks, text='Text'):
+    "Return a document with code *blocks*, or (optionstring, code) tuples."
+    parts = []
+    for i, block in enumerate(blocks):
+        optionstring = ''
+        if isinstance(block, tuple):
+            optionstring, block = block
+        parts.append('%s %d\n\n<<%s>>=\n%s\n@\n\n' %
+                     (text, i, optionstring, block))
+    return ''.join(parts)
+
+
+class ChunkCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp(prefix='pweave_test_')
+        self.cache_dir = os.path.join(self.output_dir, 'cache')
+        # the code-blocks append to this file whenever they are executed
+        self.log_path = os.path.join(self.output_dir, 'executed')
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def weave(self, document):
+        "Return (document_text, cache) of a run of *document*."
+        settings = defaultdict(lambda: None)
+        settings.update({
+            'format': 'tex',
+            'img_format': '.pdf',
+            'sourcefile_path': os.path.join(self.output_dir, 'test.w'),
+            'base_output_path': self.output_dir,
+            'imgfolder_path': os.path.join(self.output_dir, 'images'),
+            'basename': 'test',
+            'plugindir': PLUGIN_DIR,
+            'use_cache': True,
+            'cache_dir': self.cache_dir,
+            })
+        pweave.settings = settings
+        pweave.execution_backend.reset()
+        processors = pweave.load_processor_plugins(settings)
+
+        cache = pweave.ChunkCache(self.cache_dir, 1 << 20)
+        outfile = StringIO.StringIO()
+        pweave.weave(pweave.parse_chunks(document), outfile,
+                     StringIO.StringIO(), processors, cache)
+        return (outfile.getvalue(), cache)
+
+    def logged(self, name):
+        "Return code which records in the log that block *name* ran."
+        return "open(%r, 'a').write('%s ')" % (self.log_path, name)
+
+    def executed(self):
+        "Return the names of the blocks executed since the last call."
+        if not os.path.exists(self.log_path):
+            return []
+        names = open(self.log_path).read().split()
+        os.remove(self.log_path)
+        return names
+
+    def test_unchanged(self):
+        blocks = ['x = 1', 'print x + 1']
+        first, cache = self.weave(make_document(blocks))
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+        # changing the text between the blocks doesn't matter
+        second, cache = self.weave(make_document(blocks, 'Other text'))
+        self.assertEqual((cache.hits, cache.misses), (2, 0))
+        self.assertEqual(second.replace('Other text', 'Text'), first)
+
+    def test_upstream_edit(self):
+        blocks = ['x = 1', 'y = 10', 'print x + y']
+        document_text, cache = self.weave(make_document(blocks))
+        self.assertTrue('11' in document_text)
+
+        # the last block is unchanged, but what it prints is not
+        blocks[0] = 'x = 2'
+        document_text, cache = self.weave(make_document(blocks))
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+        self.assertTrue('12' in document_text)
+
+    def test_skipped_blocks_rerun(self):
+        blocks = [self.logged('a') + '\nx = 1', self.logged('b'),
+                  'print x']
+        self.weave(make_document(blocks))
+        self.assertEqual(self.executed(), ['a', 'b'])
+
+        # the blocks before the edited one run again, for its namespace
+        blocks[2] = 'print x * 5'
+        document_text, cache = self.weave(make_document(blocks))
+        self.assertEqual(self.executed(), ['a', 'b'])
+        self.assertTrue('5' in document_text)
+
+        self.weave(make_document(blocks))
+        self.assertEqual(self.executed(), [])
+
+    def test_checkpoint_resume(self):
+        blocks = [self.logged('a') + '\nx = 1',
+                  ('checkpoint=True', self.logged('b') + '\nx += 1'),
+                  self.logged('c'),
+                  'print x']
+        self.weave(make_document(blocks))
+        self.assertEqual(self.executed(), ['a', 'b', 'c'])
+
+        # only the blocks after the checkpoint run again
+        blocks[3] = 'print x * 5'
+        document_text, cache = self.weave(make_document(blocks))
+        self.assertEqual(self.executed(), ['c'])
+        self.assertTrue('10' in document_text)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_unreadable_checkpoint(self):
+        blocks = [self.logged('a') + '\nx = 1',
+                  ('checkpoint=True', 'x += 1'),
+                  'print x']
+        self.weave(make_document(blocks))
+        self.executed()
+        for path in glob.glob(os.path.join(self.cache_dir, '*.ckpt')):
+            open(path, 'wb').write('truncated')
+
+        # the checkpoint is ignored, and all the blocks run again
+        blocks[2] = 'print x * 5'
+        document_text, cache = self.weave(make_document(blocks))
+        self.assertEqual(self.executed(), ['a'])
+        self.assertTrue('10' in document_text)
+
+    def test_unpicklable_checkpoint(self):
+        blocks = [self.logged('a') + '\nf = open(%r)' % PWEAVE_SCRIPT,
+                  ('checkpoint=True', 'x = 1'),
+                  'print x']
+        self.weave(make_document(blocks))
+        self.executed()
+        self.assertEqual(glob.glob(os.path.join(self.cache_dir, '*.ckpt')),
+                         [])
+
+        blocks[2] = 'print x * 5'
+        self.weave(make_document(blocks))
+        self.assertEqual(self.executed(), ['a'])
+
+    def test_block_keys_chained(self):
+        pweave.settings = defaultdict(lambda: None, format='tex')
+        processor = pweave.DefaultProcessor({})
+        cache = pweave.ChunkCache(self.cache_dir, 1 << 20)
+        key = cache.block_key('', processor, 'x = 1', {})
+        self.assertEqual(cache.block_key('', processor, 'x = 1', {}), key)
+        self.assertNotEqual(cache.block_key('other', processor, 'x = 1', {}),
+                            key)
+        self.assertNotEqual(cache.block_key('', processor, 'x = 2', {}), key)
+        self.assertNotEqual(cache.block_key('', processor, 'x = 1',
+                                            {'echo': 'False'}), key)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Check how compile_code() and compile_statements() split code-blocks up, and
+that tracebacks point into the source document.
+
+Usage::
+
+    python -m unittest discover tests
+
+"""
+import imp
+import os
+import sys
+import traceback
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PWEAVE_SCRIPT = os.path.join(TEST_DIR, os.pardir, 'pweave', 'pweave')
+pweave = imp.load_source('pweave_script', PWEAVE_SCRIPT)
+
+
+class CompileCodeTest(unittest.TestCase):
+    def run_code(self, code, display=False):
+        "Return (namespace, displayed value) of *code*."
+        statements, expression = pweave.compile_code(code, 'doc.texw', 10,
+                                                     display)
+        namespace = {}
+        if statements is not None:
+            exec statements in namespace
+        value = None
+        if expression is not None:
+            value = eval(expression, namespace)
+        return (namespace, value)
+
+    def test_single_expression(self):
+        self.assertEqual(self.run_code('6 * 7')[1], 42)
+        self.assertEqual(self.run_code('6 * 7', display=True)[1], 42)
+
+    def test_trailing_expression(self):
+        self.assertEqual(self.run_code('x = 6 * 7\nx')[1], None)
+        namespace, value = self.run_code('x = 6 * 7; x', display=True)
+        self.assertEqual(value, 42)
+        self.assertEqual(namespace['x'], 42)
+
+    def test_statements(self):
+        namespace, value = self.run_code('x = 1\ny = x + 1\n', display=True)
+        self.assertEqual(value, None)
+        self.assertEqual(namespace['y'], 2)
+
+    def test_cached(self):
+        first = pweave.compile_code('z = 1', 'doc.texw', 1)
+        self.assertTrue(pweave.compile_code('z = 1', 'doc.texw', 1) is first)
+        self.assertFalse(pweave.compile_code('z = 1', 'doc.texw', 2) is first)
+
+    def test_traceback_position(self):
+        try:
+            self.run_code('x = 1\n\n1 / 0\n', display=True)
+        except ZeroDivisionError:
+            filename, line = traceback.extract_tb(sys.exc_info()[2])[-1][:2]
+        self.assertEqual((filename, line), ('doc.texw', 12))
+
+    def test_syntax_error_position(self):
+        try:
+            pweave.compile_code('x = 1\nx +\n', 'doc.texw', 10)
+        except SyntaxError, e:
+            self.assertEqual((e.filename, e.lineno), ('doc.texw', 11))
+        else:
+            self.fail('no SyntaxError')
+
+
+class CompileStatementsTest(unittest.TestCase):
+    def test_grouping(self):
+        code = ('a = 1; b = 2\n'
+                '\n'
+                '# comment\n'
+                'if a:\n'
+                '    print a\n'
+                '\n'
+                'b\n')
+        statements = pweave.compile_statements(code, 'doc.texw', 1)
+        self.assertEqual([lines for lines, compiled in statements], [
+            ['a = 1; b = 2'], [''], ['# comment'],
+            ['if a:', '    print a'], [''], ['b']])
+        self.assertEqual([compiled is None for lines, compiled in statements],
+                         [False, True, True, False, True, False])
+
+    def test_output_per_statement(self):
+        pweave.execution_backend.reset()
+        code = 'x = 6\nx * 7\nfor i in range(2):\n    print i\nNone\n'
+        results = pweave.execution_backend.exec_term('default', code,
+                                                     ('doc.texw', 1))
+        self.assertEqual(results, [(['x = 6'], ''),
+                                   (['x * 7'], '42\n'),
+                                   (['for i in range(2):', '    print i'],
+                                    '0\n1\n'),
+                                   (['None'], '')])
+        pweave.execution_backend.reset()
+
+    def test_line_numbers(self):
+        statements = pweave.compile_statements('x = 1\ny = 2\n', 'doc.texw',
+                                               20)
+        self.assertEqual([compiled.co_firstlineno
+                          for lines, compiled in statements], [20, 21])
+
+
+if __name__ == '__main__':
+    unittest.main()
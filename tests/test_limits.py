@@ -0,0 +1,85 @@
+"""
+Check that the per-block time limits (see ExecutionLimits) stop code-blocks,
+including those which catch the exception.
+
+Usage::
+
+    python -m unittest discover tests
+
+"""
+import imp
+import os
+import signal
+import time
+import unittest
+from collections import defaultdict
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PWEAVE_SCRIPT = os.path.join(TEST_DIR, os.pardir, 'pweave', 'pweave')
+pweave = imp.load_source('pweave_script', PWEAVE_SCRIPT)
+
+
+def sleep_swallowing(seconds, catch_all):
+    "Sleep *seconds* seconds, in steps which ignore exceptions."
+    end = time.time() + seconds
+    while time.time() < end:
+        if catch_all:
+            try:
+                time.sleep(0.05)
+            except:
+                pass
+        else:
+            try:
+                time.sleep(0.05)
+            except Exception:
+                pass
+
+
+class ExecutionLimitsTest(unittest.TestCase):
+    def check_times_out(self, function, *args):
+        start = time.time()
+        self.assertRaises(pweave.LimitExceeded,
+                          pweave.ExecutionLimits(0.2).run, function, *args)
+        return time.time() - start
+
+    def test_timeout_fires(self):
+        self.assertTrue(self.check_times_out(time.sleep, 5) < 1)
+
+    def test_except_exception(self):
+        self.assertTrue(self.check_times_out(sleep_swallowing, 5, False) < 1)
+
+    def test_bare_except(self):
+        # the exception is caught every time, but the block is still
+        # reported as having exceeded its limit
+        self.check_times_out(sleep_swallowing, 0.5, True)
+
+    def test_within_limit(self):
+        self.assertEqual(pweave.ExecutionLimits(5).run(lambda x: x * 2, 21),
+                         42)
+
+    def test_timer_stopped(self):
+        self.check_times_out(time.sleep, 5)
+        self.assertEqual(signal.getitimer(signal.ITIMER_REAL), (0.0, 0.0))
+        self.assertEqual(signal.getsignal(signal.SIGALRM),
+                         signal.SIG_DFL)
+
+    def test_block_error(self):
+        # as given by --timeout
+        pweave.settings = defaultdict(lambda: None, format='tex', timeout=0.2)
+        processor = pweave.DefaultProcessor({})
+        del pweave.limit_errors[:]
+        code = ("import time\n"
+                "for i in range(50):\n"
+                "    try:\n"
+                "        time.sleep(0.1)\n"
+                "    except Exception:\n"
+                "        pass\n")
+        document_text, code_text = processor.merge_options_and_process(code,
+                                                                       {})
+        self.assertTrue('timed out (timeout=0.2)' in document_text)
+        self.assertEqual(len(pweave.limit_errors), 1)
+        self.assertEqual(code_text, code)
+
+
+if __name__ == '__main__':
+    unittest.main()
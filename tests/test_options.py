@@ -0,0 +1,117 @@
+"""
+Check how get_options() parses the option strings of code-blocks, and how
+chunk_options() reports the ones it can't parse.
+
+Usage::
+
+    python -m unittest discover tests
+
+"""
+import imp
+import os
+import sys
+import StringIO
+import unittest
+from collections import defaultdict
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PWEAVE_SCRIPT = os.path.join(TEST_DIR, os.pardir, 'pweave', 'pweave')
+pweave = imp.load_source('pweave_script', PWEAVE_SCRIPT)
+
+
+class GetOptionsTest(unittest.TestCase):
+    def test_plain(self):
+        self.assertEqual(pweave.get_options(''), {'p': 'default'})
+        self.assertEqual(pweave.get_options('echo=False, fig = True'),
+                         {'p': 'default', 'echo': 'False', 'fig': 'True'})
+
+    def test_block_name(self):
+        self.assertEqual(pweave.get_options('setup, echo=False'),
+                         {'p': 'default', '__pweave_block_name': 'setup',
+                          'echo': 'False'})
+        self.assertEqual(pweave.get_options('"my setup"'),
+                         {'p': 'default', '__pweave_block_name': 'my setup'})
+
+    def test_processor(self):
+        self.assertEqual(pweave.get_options('p=rst_table, echo=False'),
+                         {'p': 'rst_table', 'echo': 'False'})
+
+    def test_quoted(self):
+        options = pweave.get_options('caption="a, b=c", width=5')
+        self.assertEqual(options['caption'], 'a, b=c')
+        self.assertEqual(options['width'], '5')
+        self.assertEqual(pweave.get_options(r'caption="say \"hi\""')
+                         ['caption'], 'say "hi"')
+        self.assertEqual(pweave.get_options(r'path=C:\temp')['path'],
+                         r'C:\temp')
+
+    def test_empty_elements(self):
+        self.assertEqual(pweave.get_options('echo=False,, fig=True,'),
+                         {'p': 'default', 'echo': 'False', 'fig': 'True'})
+
+    def test_commented_out(self):
+        self.assertTrue(pweave.get_options('#echo=False')
+                        ['__pweave_do_not_process'])
+
+    def test_cached(self):
+        options = pweave.get_options('echo=False, cached=True')
+        self.assertTrue(pweave.get_options('echo=False, cached=True')
+                        is options)
+        self.assertRaises(TypeError, options.__setitem__, 'echo', 'True')
+        copy = options.copy()
+        copy['echo'] = 'True'
+        self.assertEqual(options['echo'], 'False')
+
+    def check_error(self, optionstring, column, options):
+        try:
+            pweave.get_options(optionstring)
+        except pweave.OptionsError, e:
+            self.assertEqual(e.column, column)
+            self.assertEqual(e.options, options)
+        else:
+            self.fail("no OptionsError for %r" % optionstring)
+
+    def test_errors(self):
+        self.check_error('echo=False, fig', 12, {'p': 'default',
+                                                 'echo': 'False'})
+        self.check_error('echo=False, caption="open', 20,
+                         {'p': 'default', 'echo': 'False'})
+        self.check_error('=True', 0, {'p': 'default'})
+        self.check_error('a="x"y', 5, {'p': 'default'})
+
+
+class ChunkOptionsTest(unittest.TestCase):
+    def setUp(self):
+        pweave.settings = defaultdict(lambda: None, format='tex',
+                                      sourcefile_path='doc.Pnw')
+        pweave.reported_option_errors.clear()
+
+    def chunk_options(self, source):
+        "Return (options, printed_output) of the last chunk of *source*."
+        chunk = pweave.parse_chunks(source)[-1]
+        stdout = sys.stdout
+        sys.stdout = StringIO.StringIO()
+        try:
+            options = pweave.chunk_options(chunk)
+            return (options, sys.stdout.getvalue())
+        finally:
+            sys.stdout = stdout
+
+    def test_warning(self):
+        source = 'Text\n\n<<echo=False, fig>>=\nx = 1\n@\n'
+        options, output = self.chunk_options(source)
+        self.assertEqual(options, {'p': 'default', 'echo': 'False'})
+        self.assertEqual(output, "WARNING: doc.Pnw:3:15: unparseable "
+                                 "block-options: missing '=' after 'fig'\n")
+
+        # reported once only
+        self.assertEqual(self.chunk_options(source)[1], '')
+
+    def test_no_warning(self):
+        options, output = self.chunk_options('<<echo=False>>=\nx = 1\n@\n')
+        self.assertEqual(options, {'p': 'default', 'echo': 'False'})
+        self.assertEqual(output, '')
+
+
+if __name__ == '__main__':
+    unittest.main()
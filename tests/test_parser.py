@@ -0,0 +1,81 @@
+"""
+Check how the chunk tokenizer (see iter_chunks()) splits pweave source files
+into text and code chunks.
+
+Usage::
+
+    python -m unittest discover tests
+
+"""
+import imp
+import os
+import StringIO
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PWEAVE_SCRIPT = os.path.join(TEST_DIR, os.pardir, 'pweave', 'pweave')
+pweave = imp.load_source('pweave_script', PWEAVE_SCRIPT)
+Chunk = pweave.Chunk
+
+
+class ChunkParserTest(unittest.TestCase):
+    def test_text_and_code(self):
+        source = ('Intro\n'
+                  '\n'
+                  '<<name, echo=False>>=\n'
+                  'x = 1\n'
+                  'print x\n'
+                  '@\n'
+                  'Outro\n')
+        self.assertEqual(pweave.parse_chunks(source), [
+            Chunk('text', 'Intro\n\n', None, 1, 2),
+            Chunk('code', 'x = 1\nprint x\n', 'name, echo=False', 3, 6),
+            Chunk('text', 'Outro\n', None, 7, 7),
+            ])
+
+    def test_adjacent_blocks(self):
+        source = '<<>>=\na = 1\n@\n  <<b>>=  \nb = 2\n@\n'
+        self.assertEqual(pweave.parse_chunks(source), [
+            Chunk('code', 'a = 1\n', '', 1, 3),
+            Chunk('code', 'b = 2\n', 'b', 4, 6),
+            ])
+
+    def test_options_replaced(self):
+        source = '<<first>>=\na = 1\n<<second>>=\nb = 2\n@\n'
+        self.assertEqual(pweave.parse_chunks(source), [
+            Chunk('code', 'a = 1\nb = 2\n', 'second', 1, 5),
+            ])
+
+    def test_unterminated_block(self):
+        source = 'Text\n<<>>=\na = 1\n'
+        self.assertEqual(pweave.parse_chunks(source), [
+            Chunk('text', 'Text\n', None, 1, 1),
+            ])
+
+    def test_stray_terminator(self):
+        source = '<<fig=True>>=\na = 1\n@\nText\n@ more\n'
+        self.assertEqual(pweave.parse_chunks(source), [
+            Chunk('code', 'a = 1\n', 'fig=True', 1, 3),
+            Chunk('text', 'Text\n', None, 4, 4),
+            Chunk('code', '', 'fig=True', 5, 5),
+            ])
+
+    def test_not_a_block_start(self):
+        source = 'x >>= 1\n<<a>>= trailing\n@\n'
+        chunks = pweave.parse_chunks(source)
+        self.assertEqual(chunks[0], Chunk('text', 'x >>= 1\n', None, 1, 1))
+        self.assertEqual(chunks[1].optionstring, 'a')
+
+    def test_carriage_returns_kept(self):
+        source = 'Text\r\n<<>>=\r\na = 1\r\n@\r\n'
+        chunks = pweave.parse_chunks(source)
+        self.assertEqual([c.text for c in chunks], ['Text\r\n', 'a = 1\r\n'])
+
+    def test_iter_chunks_from_file(self):
+        source = 'Intro\n<<>>=\na = 1\n@\nOutro\n' * 3
+        self.assertEqual(list(pweave.iter_chunks(StringIO.StringIO(source))),
+                         pweave.parse_chunks(source))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Check how find_sections() groups code-blocks into independent sections for
+--parallel, and that a document woven in parallel is woven as in order.
+
+Usage::
+
+    python -m unittest discover tests
+
+"""
+import imp
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+from collections import defaultdict
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PWEAVE_SCRIPT = os.path.join(TEST_DIR, os.pardir, 'pweave', 'pweave')
+PLUGIN_DIR = os.path.join(TEST_DIR, os.pardir, 'pweave', 'pweave_plugins')
+pweave = imp.load_source('pweave_script', PWEAVE_SCRIPT)
+
+
+class FindSectionsTest(unittest.TestCase):
+    def setUp(self):
+        pweave.settings = defaultdict(lambda: None, format='tex')
+        self.processor = pweave.DefaultProcessor({})
+
+    def sections(self, blocks):
+        "find_sections() of code *blocks*, or (optionstring, code) tuples."
+        analyzed = []
+        for block in blocks:
+            optionstring = ''
+            if isinstance(block, tuple):
+                optionstring, block = block
+            options = self.processor.merged_options(
+                                    pweave.get_options(optionstring))
+            analyzed.append((block, options, self.processor))
+        return pweave.find_sections(analyzed)
+
+    def test_independent(self):
+        self.assertEqual(self.sections(['import math',
+                                        'a = math.sqrt(4)\nprint a',
+                                        'b = 2\nprint b']),
+                         ([[1], [2]], [0]))
+
+    def test_dependent(self):
+        self.assertEqual(self.sections(['a = 1', 'b = 2', 'print a']),
+                         ([[0, 2], [1]], []))
+
+    def test_modified_value(self):
+        # the block appending to x must run before the one printing it
+        self.assertEqual(self.sections(['x = []', 'y = 1', 'x.append(y)',
+                                        'print x']),
+                         ([[0, 1, 2, 3]], []))
+        self.assertEqual(self.sections(['x = []', 'x.append(1)', 'y = 2',
+                                        'print x']),
+                         ([[0, 1, 3], [2]], []))
+
+    def test_functions(self):
+        self.assertEqual(self.sections(['a = 1', 'def f():\n    return a',
+                                        'b = 2', 'print f()']),
+                         ([[0, 1, 3], [2]], []))
+
+    def test_depends_option(self):
+        self.assertEqual(self.sections([('setup', 'import random\n'
+                                                  'random.seed(1)'),
+                                        'b = 2',
+                                        ('depends=setup',
+                                         'print random.random()')]),
+                         ([[0, 2], [1]], []))
+
+    def test_figures(self):
+        self.assertEqual(self.sections(['import matplotlib.pyplot as plt',
+                                        'plt.plot([1, 2])',
+                                        'x = 1',
+                                        ('fig=True', 'plt.title("t")')]),
+                         ([[1, 3], [2]], [0]))
+
+    def test_dynamic(self):
+        self.assertEqual(self.sections(['a = 1', 'exec "b = a"']), None)
+        self.assertEqual(self.sections(['a = 1', 'print globals()["a"]']),
+                         None)
+
+
+class WeaveParallelTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp(prefix='pweave_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def weave(self, document, jobs):
+        settings = defaultdict(lambda: None)
+        settings.update({
+            'format': 'tex',
+            'img_format': '.pdf',
+            'sourcefile_path': os.path.join(self.output_dir, 'test.w'),
+            'base_output_path': self.output_dir,
+            'imgfolder_path': os.path.join(self.output_dir, 'images'),
+            'basename': 'test',
+            'plugindir': PLUGIN_DIR,
+            })
+        pweave.settings = settings
+        pweave.execution_backend.reset()
+        processors = pweave.load_processor_plugins(settings)
+
+        outfile = StringIO.StringIO()
+        pyfile = StringIO.StringIO()
+        chunks = pweave.parse_chunks(document)
+        if jobs > 1:
+            pweave.weave_parallel(chunks, outfile, pyfile, processors, None,
+                                  jobs)
+        else:
+            pweave.weave(chunks, outfile, pyfile, processors)
+        return (outfile.getvalue(), pyfile.getvalue())
+
+    def test_same_as_serial(self):
+        blocks = ['import math', 'a = [1]', 'b = math.pi', 'a.append(2)',
+                  'print b', 'print a', 'c = 3\nc * 2']
+        document = ''.join('Text %d\n<<>>=\n%s\n@\n' % (i, block)
+                           for i, block in enumerate(blocks))
+        self.assertEqual(self.weave(document, 2), self.weave(document, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
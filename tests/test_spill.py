@@ -0,0 +1,90 @@
+"""
+Check that code-block output spilled to disk (see SpilledText) is woven into
+the document exactly like output kept in memory.
+
+Usage::
+
+    python -m unittest discover tests
+
+"""
+import imp
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+from collections import defaultdict
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PWEAVE_SCRIPT = os.path.join(TEST_DIR, os.pardir, 'pweave', 'pweave')
+PLUGIN_DIR = os.path.join(TEST_DIR, os.pardir, 'pweave', 'pweave_plugins')
+pweave = imp.load_source('pweave_script', PWEAVE_SCRIPT)
+
+# about 1.2 MB of output, more than a --spill-size of 1
+BIG_OUTPUT = "('line of output\\n' * 80000)"
+
+
+class SpilledOutputTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp(prefix='pweave_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def weave(self, fmt, document, spill_size):
+        "Return the woven *document*, spilling output above *spill_size* MB."
+        settings = defaultdict(lambda: None)
+        settings.update({
+            'format': fmt,
+            'img_format': '.png',
+            'sourcefile_path': os.path.join(self.output_dir, 'test.w'),
+            'base_output_path': self.output_dir,
+            'imgfolder_path': os.path.join(self.output_dir, 'images'),
+            'basename': 'test',
+            'plugindir': PLUGIN_DIR,
+            'spill_size': spill_size,
+            })
+        pweave.settings = settings
+        pweave.execution_backend.reset()
+        processors = pweave.load_processor_plugins(settings)
+
+        outfile = StringIO.StringIO()
+        pweave.weave(pweave.parse_chunks(document), outfile,
+                     StringIO.StringIO(), processors)
+        return outfile.getvalue()
+
+    def check_formats(self, code):
+        for fmt in ['tex', 'rst']:
+            for results in ['verbatim', 'rst', 'tex']:
+                document = ('Text\n\n<<results="%s">>=\n%s\n@\n\nMore text\n'
+                            % (results, code))
+                in_memory = self.weave(fmt, document, 0)
+                spilled = self.weave(fmt, document, 1)
+                self.assertTrue(len(in_memory) > 1000000)
+                self.assertEqual(spilled, in_memory,
+                                 "%s document with results=%s differs" %
+                                 (fmt, results))
+
+    def test_final_newline(self):
+        self.check_formats("import sys\nsys.stdout.write(%s)" % BIG_OUTPUT)
+
+    def test_no_final_newline(self):
+        self.check_formats("import sys\nsys.stdout.write(%s + 'end')" %
+                           BIG_OUTPUT)
+
+    def test_carriage_returns(self):
+        self.check_formats("import sys\nsys.stdout.write(%s.replace('\\n', "
+                           "'\\r\\n') + 'a\\rb\\r')" % BIG_OUTPUT)
+
+    def test_output_is_spilled(self):
+        pweave.settings = defaultdict(lambda: None, spill_size=1)
+        processor = pweave.DefaultProcessor({})
+        result = processor.exec_code("print %s" % BIG_OUTPUT, spill=True)
+        try:
+            self.assertTrue(isinstance(result, pweave.SpilledText))
+        finally:
+            result.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
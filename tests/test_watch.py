@@ -0,0 +1,112 @@
+"""
+Check that the IncrementalWeaver of --watch mode executes only the code-blocks
+it has to, and gives the same results as weaving the document afresh.
+
+Usage::
+
+    python -m unittest discover tests
+
+"""
+import imp
+import os
+import shutil
+import tempfile
+import unittest
+from collections import defaultdict
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PWEAVE_SCRIPT = os.path.join(TEST_DIR, os.pardir, 'pweave', 'pweave')
+PLUGIN_DIR = os.path.join(TEST_DIR, os.pardir, 'pweave', 'pweave_plugins')
+pweave = imp.load_source('pweave_script', PWEAVE_SCRIPT)
+
+
+def make_document(blocks):
+    return ''.join('Text %d\n\n<<>>=\n%s\n@\n\n' % (i, block)
+                   for i, block in enumerate(blocks))
+
+
+class IncrementalWeaverTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp(prefix='pweave_test_')
+        settings = defaultdict(lambda: None)
+        settings.update({
+            'format': 'tex',
+            'img_format': '.pdf',
+            'sourcefile_path': os.path.join(self.output_dir, 'test.w'),
+            'base_output_path': self.output_dir,
+            'imgfolder_path': os.path.join(self.output_dir, 'images'),
+            'basename': 'test',
+            'plugindir': PLUGIN_DIR,
+            })
+        pweave.settings = settings
+        pweave.execution_backend.reset()
+        self.weaver = pweave.IncrementalWeaver(
+                            pweave.load_processor_plugins(settings))
+
+    def tearDown(self):
+        pweave.execution_backend.reset()
+        shutil.rmtree(self.output_dir)
+
+    def update(self, blocks):
+        "Weave *blocks*; return (document_text, executed)."
+        document_text, code_text, executed = self.weaver.update(
+                pweave.parse_chunks(make_document(blocks)))
+        return (document_text, executed)
+
+    def fresh(self, blocks):
+        "Return the document_text of *blocks* woven from the start."
+        pweave.execution_backend.reset()
+        weaver = pweave.IncrementalWeaver(self.weaver.processors)
+        return weaver.update(pweave.parse_chunks(make_document(blocks)))[0]
+
+    def test_edit_last_block(self):
+        blocks = ['class C(object):\n    pass\nc = C()\nc.v = [1]',
+                  'c.v.append(2)',
+                  'print c.v, 0']
+        self.assertEqual(self.update(blocks)[1], 3)
+        blocks[2] = 'print c.v, 1'
+        document_text, executed = self.update(blocks)
+        self.assertEqual(executed, 1)
+        self.assertTrue('[1, 2] 1' in document_text)
+
+    def test_modified_in_place(self):
+        blocks = ['a = [1]', 'a.append(2)', 'print a']
+        self.update(blocks)
+        blocks[1] = 'a.append(3)'
+        document_text, executed = self.update(blocks)
+        self.assertEqual(executed, 2)
+        self.assertTrue('[1, 3]' in document_text)
+        self.assertEqual(document_text, self.fresh(blocks))
+
+    def test_unpicklable_value(self):
+        blocks = ['f = open(%r)\na = [1]' % PWEAVE_SCRIPT, 'a.append(2)',
+                  'print a, f.closed']
+        self.update(blocks)
+        blocks[2] = 'print a, f.closed, 1'
+        document_text, executed = self.update(blocks)
+        self.assertEqual(executed, 1)
+        self.assertTrue('[1, 2] False 1' in document_text)
+
+    def test_snapshots_bounded(self):
+        blocks = ['x = 0'] + ['x += %d' % i for i in range(1, 100)] + \
+                 ['print x']
+        self.update(blocks)
+        max_snapshots = pweave.IncrementalWeaver.max_snapshots
+        self.assertTrue(len(self.weaver.snapshots) <= max_snapshots + 1)
+
+        blocks[50] = 'x += 1000'
+        document_text, executed = self.update(blocks)
+        self.assertTrue(executed <= len(blocks) - 50 +
+                        self.weaver.snapshot_interval)
+        self.assertTrue(len(self.weaver.snapshots) <= max_snapshots + 1)
+        self.assertEqual(document_text, self.fresh(blocks))
+
+        # the block just added is the one usually edited next
+        blocks.append('print x * 2')
+        self.update(blocks)
+        blocks[-1] = 'print x * 3'
+        self.assertEqual(self.update(blocks)[1], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()